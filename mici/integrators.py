@@ -1,12 +1,233 @@
 """Symplectic integrators for simulation of Hamiltonian dynamics."""
 
 from abc import ABC, abstractmethod
+from functools import lru_cache, partial
+import importlib.util
+import sys
+import numpy as np
 from mici.errors import NonReversibleStepError
 from mici.solvers import (maximum_norm, solve_fixed_point_direct,
                           solve_projection_onto_manifold_quasi_newton)
+from mici.systems import (
+    System, EuclideanMetricSystem, BatchedEuclideanMetricSystem,
+    JaxEuclideanMetricSystem, BatchedJaxEuclideanMetricSystem,
+    GaussianEuclideanMetricSystem)
+from mici.matrices import IdentityMatrix, ScaledIdentityMatrix, DiagonalMatrix
+
+# Numba and JAX are only imported when constructing compiled loops as they are
+# slow to import
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
+JAX_AVAILABLE = importlib.util.find_spec('jax') is not None
 
 __pdoc__ = {}
 
+# Library flow maps which assign new state variable values rather than
+# updating the existing variable arrays in place
+_VARIABLE_ASSIGNING_FLOWS = {
+    System.h1_flow, EuclideanMetricSystem.h2_flow,
+    GaussianEuclideanMetricSystem.h2_flow}
+
+
+def _is_numba_jitted(func):
+    """Check if a function is Numba compiled without importing Numba."""
+    # A function can only have been compiled if Numba has been imported
+    numba = sys.modules.get('numba')
+    return numba is not None and numba.extending.is_jitted(func)
+
+
+@lru_cache(maxsize=None)
+def _numba_leapfrog_kernels():
+    """Construct Numba compiled functions simulating leapfrog steps.
+
+    Returns:
+        kernels (Dict[str, Callable]): Dictionary of compiled functions, with
+            `leapfrog_n_step`, `batched_leapfrog_n_step` and
+            `parallel_batched_leapfrog_n_step` the loop kernels and
+            `elementwise_metric_inv_mult` and `dense_metric_inv_mult` the
+            functions to pass to the kernels to multiply by the metric
+            inverse.
+    """
+    import numba
+
+    def grad_array(grad):
+        """Extract gradient array from return value of a gradient function."""
+        return grad[0] if isinstance(grad, tuple) else grad
+
+    @numba.extending.overload(grad_array)
+    def grad_array_overload(grad):
+        if isinstance(grad, numba.types.BaseTuple):
+            return lambda grad: grad[0]
+        else:
+            return lambda grad: grad
+
+    @numba.njit(cache=True)
+    def elementwise_metric_inv_mult(metric_inv, mom):
+        return metric_inv * mom
+
+    @numba.njit(cache=True)
+    def dense_metric_inv_mult(metric_inv, mom):
+        return metric_inv @ mom
+
+    # Kernels taking function arguments are not cached to disk as their
+    # signatures include the argument function types, which differ between
+    # processes so that cached versions are never reused
+
+    @numba.njit
+    def leapfrog_n_step(pos, mom, grad, dt, n_step, grad_neg_log_dens,
+                         metric_inv, metric_inv_mult):
+        """Simulate `n_step` leapfrog steps of a Euclidean metric system.
+
+        `pos` and `mom` arrays are updated in place, with `grad` the gradient
+        of the negative log density at the initial position and `n_step`
+        positive. The product of the metric inverse and momentum is computed
+        as `metric_inv_mult(metric_inv, mom)`. Returns a tuple of a flag which
+        is `False` if a non-finite gradient is encountered, in which case
+        integration is terminated early, and `True` otherwise, and the output
+        of the last `grad_neg_log_dens` call, at the final position.
+        """
+        for s in range(n_step):
+            mom -= 0.5 * dt * grad
+            pos += dt * metric_inv_mult(metric_inv, mom)
+            grad_out = grad_neg_log_dens(pos)
+            grad = grad_array(grad_out)
+            mom -= 0.5 * dt * grad
+            if not np.all(np.isfinite(grad)):
+                return False, grad_out
+        return True, grad_out
+
+    @numba.njit
+    def batched_leapfrog_n_step(pos, mom, grad, dt, n_step,
+                                 grad_neg_log_dens, metric_inv,
+                                 metric_inv_mult):
+        """Simulate `n_step` leapfrog steps of a batched Euclidean system.
+
+        `pos`, `mom` and `grad` are arrays of shape `(n_chain, n_dim)` and `dt`
+        an array of shape `(n_chain,)` of per-chain time steps, with `pos` and
+        `mom` updated in place. The (batched) gradient function is evaluated
+        for all chains after each update of the chain positions. Returns
+        a tuple of a boolean array indicating for each chain whether all
+        gradients evaluated were finite and the output of the last
+        `grad_neg_log_dens` call, at the final positions.
+        """
+        n_chain = pos.shape[0]
+        valid = np.ones(n_chain, dtype=np.bool_)
+        for s in range(n_step):
+            for c in numba.prange(n_chain):
+                mom[c] -= 0.5 * dt[c] * grad[c]
+                pos[c] += dt[c] * metric_inv_mult(metric_inv, mom[c])
+            grad_out = grad_neg_log_dens(pos)
+            grad = grad_array(grad_out)
+            for c in numba.prange(n_chain):
+                mom[c] -= 0.5 * dt[c] * grad[c]
+                valid[c] = valid[c] and np.all(np.isfinite(grad[c]))
+        return valid, grad_out
+
+    # Variant performing the position and momentum updates of the chains in
+    # each step in parallel threads
+    parallel_batched_leapfrog_n_step = numba.njit(parallel=True)(
+        batched_leapfrog_n_step.py_func)
+
+    return {
+        'leapfrog_n_step': leapfrog_n_step,
+        'batched_leapfrog_n_step': batched_leapfrog_n_step,
+        'parallel_batched_leapfrog_n_step': parallel_batched_leapfrog_n_step,
+        'elementwise_metric_inv_mult': elementwise_metric_inv_mult,
+        'dense_metric_inv_mult': dense_metric_inv_mult,
+    }
+
+
+def _make_jax_leapfrog_n_step(value_and_grad_neg_log_dens):
+    """Construct JAX compiled function simulating leapfrog steps.
+
+    The returned function takes arguments `(pos, mom, grad, value, dt, n_step,
+    metric_inv, dense)` with `value` the negative log density at the initial
+    position, the others except `dense` as for the Numba `leapfrog_n_step`
+    kernel and `dense` a static flag indicating whether `metric_inv` is a
+    dense matrix array (`True`) or is a scalar or array of diagonal values to
+    multiply the momentum elementwise by (`False`). A tuple of the final
+    position, final momentum, gradient and value of the negative log density
+    at the final position and a flag indicating whether all steps completed
+    without a non-finite gradient is returned.
+
+    If `value_and_grad_neg_log_dens` is vectorised over a batch of chains, the
+    position, momentum and gradient arguments may instead be arrays of shape
+    `(n_chain, n_dim)`, `value` an array of shape `(n_chain,)` and `dt` an
+    array of shape `(n_chain, 1)`, with the returned flag then an array of
+    shape `(n_chain,)` and the loop terminated early only if all chains
+    encounter a non-finite gradient.
+    """
+    import jax
+    import jax.numpy as jnp
+
+    @partial(jax.jit, static_argnames='dense')
+    def leapfrog_n_step(pos, mom, grad, value, dt, n_step, metric_inv, dense):
+
+        def cond_fun(carry):
+            s, pos, mom, grad, value, valid = carry
+            return (s < n_step) & jnp.any(valid)
+
+        def body_fun(carry):
+            s, pos, mom, grad, value, valid = carry
+            mom = mom - 0.5 * dt * grad
+            # Metric inverse is symmetric so right multiplying a batch of
+            # momentums is equivalent to left multiplying each
+            pos = pos + dt * (mom @ metric_inv if dense else metric_inv * mom)
+            value, grad = value_and_grad_neg_log_dens(pos)
+            mom = mom - 0.5 * dt * grad
+            valid = valid & jnp.all(jnp.isfinite(grad), -1)
+            return s + 1, pos, mom, grad, value, valid
+
+        valid = jnp.ones(pos.shape[:-1], dtype=bool)
+        _, pos, mom, grad, value, valid = jax.lax.while_loop(
+            cond_fun, body_fun, (0, pos, mom, grad, value, valid))
+        return pos, mom, grad, value, valid
+
+    return leapfrog_n_step
+
+
+def _metric_inv_representation(metric, dim, dtype):
+    """Compute representation of metric matrix inverse for compiled loops.
+
+    Args:
+        metric (mici.matrices.PositiveDefiniteMatrix): Metric matrix.
+        dim (int): Dimension of position space.
+        dtype (numpy.dtype): Floating point type of state variables.
+
+    Returns:
+        metric_inv (float or array): Scalar or 1D array of diagonal values
+            to multiply momentum elementwise by if `dense` is `False`,
+            otherwise 2D array representation of metric matrix inverse.
+        dense (bool): Whether `metric_inv` is a dense 2D matrix array.
+    """
+    # Matrix classes customise isinstance checks so inspect the class MRO
+    mro = type(metric).__mro__
+    if IdentityMatrix in mro:
+        return dtype.type(1.), False
+    elif ScaledIdentityMatrix in mro:
+        return dtype.type(metric.inv.scalar), False
+    elif DiagonalMatrix in mro:
+        return np.ascontiguousarray(metric.inv.diagonal, dtype=dtype), False
+    else:
+        return np.ascontiguousarray(
+            metric.inv @ np.identity(dim), dtype=dtype), True
+
+
+def _cache_grad_neg_log_dens(system, state, grad_out):
+    """Cache output of system negative log density gradient function in state.
+
+    `grad_out` is either the gradient of the negative log density at the state
+    position or a tuple of the gradient and value, as returned by the
+    `grad_neg_log_dens` function a system is constructed with. The values are
+    cached under the same keys as used by the `grad_neg_log_dens` and
+    `neg_log_dens` methods of `mici.systems.System`.
+    """
+    prefix = type(system).__name__ + '.'
+    keys = (prefix + 'grad_neg_log_dens', prefix + 'neg_log_dens')
+    vals = grad_out if isinstance(grad_out, tuple) else (grad_out,)
+    for key, val in zip(keys, vals):
+        state._dependencies['pos'].add(key)
+        state._cache[key] = val
+
 
 class Integrator(ABC):
     """Base class for integrators."""
@@ -51,9 +272,35 @@ class ExplicitLeapfrogIntegrator(Integrator):
     exact flows can be computed.
 
     `LeapfrogIntegrator` is an alias for `ExplicitLeapfrogIntegrator`.
+
+    If Numba is available, the system is a `mici.systems.EuclideanMetricSystem`
+    or `mici.systems.BatchedEuclideanMetricSystem` instance and the
+    `grad_neg_log_dens` function it was constructed with is a Numba `njit`
+    compiled function, then the `jit_multi_step` method can be used to
+    simulate multiple integrator steps in a single compiled loop, avoiding the
+    interpreter overhead of repeated `step` calls. For batched systems the
+    updates of the chains in each step can optionally be parallelised across
+    threads. The `jit_multi_step` method can also be used if the system is a
+    `mici.systems.JaxEuclideanMetricSystem` or
+    `mici.systems.BatchedJaxEuclideanMetricSystem` instance, with the loop
+    then compiled with JAX.
     """
 
-    def __init__(self, system, step_size):
+    def __init__(self, system, step_size, thread_parallel=False):
+        """
+        Args:
+            system (mici.systems.System): Hamiltonian system to integrate the
+                dynamics of.
+            step_size (float): Integrator time step.
+            thread_parallel (bool): Whether to parallelise the updates of the
+                chains in each step across threads when simulating steps of a
+                `mici.systems.BatchedEuclideanMetricSystem` instance in a
+                Numba compiled loop with `jit_multi_step`. Numba's threading
+                layers may deadlock in processes forked after parallel code
+                has run, so this should not be used in a process which then
+                samples chains in multiple processes with `sample_chains`.
+                Defaults to `False`.
+        """
         if not hasattr(system, 'h1_flow') or not hasattr(system, 'h2_flow'):
             raise ValueError(
                 'Explicit leapfrog integrator can only be used for systems '
@@ -61,10 +308,119 @@ class ExplicitLeapfrogIntegrator(Integrator):
                 'flow maps. For systems in which only `h1_flow` is available '
                 'the `ImplicitLeapfrogIntegrator` class may be used instead.')
         super().__init__(system, step_size)
+        self.thread_parallel = thread_parallel
+        self._metric_inv_cache = None
+        # State variables can only be shared with the stepped state if the
+        # flow maps do not update the variables in place
+        self._share_state_variables = (
+            type(system).h1_flow in _VARIABLE_ASSIGNING_FLOWS and
+            type(system).h2_flow in _VARIABLE_ASSIGNING_FLOWS)
+        self._init_jax_leapfrog_n_step()
+
+    def _init_jax_leapfrog_n_step(self):
+        if JAX_AVAILABLE and type(self.system) in (
+                JaxEuclideanMetricSystem, BatchedJaxEuclideanMetricSystem):
+            self._jax_leapfrog_n_step = _make_jax_leapfrog_n_step(
+                self.system._jax_model_functions
+                .jit_value_and_grad_neg_log_dens)
+        else:
+            self._jax_leapfrog_n_step = None
+
+    def __getstate__(self):
+        # Compiled JAX loop cannot be pickled so is constructed again when
+        # unpickling
+        state = self.__dict__.copy()
+        del state['_jax_leapfrog_n_step']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_jax_leapfrog_n_step()
+
+    @property
+    def can_jit_multi_step(self):
+        """Whether `jit_multi_step` can be used with the integrated system."""
+        return self._jax_leapfrog_n_step is not None or (
+            NUMBA_AVAILABLE and type(self.system) in (
+                EuclideanMetricSystem, BatchedEuclideanMetricSystem) and
+            _is_numba_jitted(self.system._grad_neg_log_dens))
+
+    def _get_metric_inv(self, dim, dtype):
+        # Representation is recomputed if the system metric is reassigned
+        metric = self.system.metric
+        if (self._metric_inv_cache is None or
+                self._metric_inv_cache[0] is not metric or
+                self._metric_inv_cache[1:3] != (dim, dtype)):
+            self._metric_inv_cache = (
+                metric, dim, dtype,
+                *_metric_inv_representation(metric, dim, dtype))
+        return self._metric_inv_cache[3:]
+
+    def jit_multi_step(self, state, n_step):
+        """Perform multiple integrator steps in a Numba or JAX compiled loop.
+
+        Requires `can_jit_multi_step` to be `True`.
+
+        Args:
+            state (mici.states.ChainState): System state to perform integrator
+                steps from.
+            n_step (int): Number of integrator steps to perform. Must be
+                positive.
+
+        Returns:
+            new_state (mici.states.ChainState): New object corresponding to
+                stepped state.
+            valid (bool or array): Whether all steps completed without a
+                non-finite gradient being encountered. For batched systems a
+                boolean array with an entry for each chain.
+        """
+        if n_step < 1:
+            raise ValueError('Number of steps must be positive.')
+        dt = state.dir * self.step_size
+        dtype = state.pos.dtype
+        metric_inv, dense = self._get_metric_inv(state.pos.shape[-1], dtype)
+        batched = isinstance(self.system, BatchedEuclideanMetricSystem)
+        if batched:
+            dt = np.broadcast_to(dt, (state.pos.shape[0], 1)).astype(dtype)
+        grad = self.system.dh1_dpos(state)
+        if self._jax_leapfrog_n_step is not None:
+            # Negative log density value is cached when computing gradient
+            pos, mom, grad, value, valid = self._jax_leapfrog_n_step(
+                state.pos, state.mom, grad, self.system.neg_log_dens(state),
+                dt, n_step, metric_inv, dense)
+            # NumPy views of JAX arrays are read-only so copy to allow the
+            # state variables to be updated in place
+            pos, mom = np.array(pos), np.array(mom)
+            grad_out = (np.asarray(grad), np.asarray(value)[()])
+            valid = np.asarray(valid) if batched else bool(valid)
+        else:
+            # Steps are simulated in the precision of the state variables
+            pos, mom = state.pos.copy(), state.mom.copy()
+            kernels = _numba_leapfrog_kernels()
+            metric_inv_mult = kernels[
+                'dense_metric_inv_mult' if dense else
+                'elementwise_metric_inv_mult']
+            if batched:
+                dt = dt.reshape(-1)
+                leapfrog_n_step = kernels[
+                    'parallel_batched_leapfrog_n_step' if self.thread_parallel
+                    else 'batched_leapfrog_n_step']
+            else:
+                dt = dtype.type(dt)
+                leapfrog_n_step = kernels['leapfrog_n_step']
+            valid, grad_out = leapfrog_n_step(
+                pos, mom, np.asarray(grad), dt, n_step,
+                self.system._grad_neg_log_dens, metric_inv, metric_inv_mult)
+        state = state.copy(share_variables=True)
+        state.pos = pos
+        state.mom = mom
+        # Cache gradient (and value) at final position to avoid recomputing
+        _cache_grad_neg_log_dens(self.system, state, grad_out)
+        return state, valid
 
     def step(self, state):
         dt = state.dir * self.step_size
-        state = state.copy()
+        state = state.copy(share_variables=self._share_state_variables)
         self.system.h1_flow(state, 0.5 * dt)
         self.system.h2_flow(state, dt)
         self.system.h1_flow(state, 0.5 * dt)
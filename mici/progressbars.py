@@ -458,10 +458,25 @@ if TQDM_AVAILABLE:
     class TqdmProgressBar(BaseProgressBar):
         """Wrapper of `tqdm` with same interface as `ProgressBar`."""
 
-        def __init__(self, n_iter, description=None, position=(0, 1)):
+        def __init__(self, n_iter, description=None, position=(0, 1),
+                     min_refresh_time=0.25):
+            """
+            Args:
+                n_iter (int): Number of iterations to iterate over.
+                description (None or str): Description of task to prefix
+                    progress bar with.
+                position (Tuple[int, int]): Tuple specifying position of
+                    progress bar within a sequence with first entry
+                    corresponding to zero-indexed position and the second entry
+                    the total number of progress bars.
+                min_referesh_time (float): Minimum time in seconds between
+                    each update of the wrapped `tqdm` object.
+            """
             super().__init__(n_iter, description, position)
             self._stats_dict = {}
             self._tqdm_obj = None
+            self._min_refresh_time = min_refresh_time
+            self._last_refresh_time = -float('inf')
 
         def update(self, iter, iter_dict=None, refresh=True):
             if self._tqdm_obj is None:
@@ -469,21 +484,34 @@ if TQDM_AVAILABLE:
                     'Must enter object first in context manager.')
             if iter == 0:
                 self._tqdm_obj.reset()
+                self._last_refresh_time = -float('inf')
             elif not self._tqdm_obj.disable:
-                self._tqdm_obj.update(iter - self._tqdm_obj.n)
                 if iter_dict is not None:
                     _update_stats_running_means(
                         iter, self._stats_dict, iter_dict)
-                    self._tqdm_obj.set_postfix(self._stats_dict)
-                if iter == self._n_iter:
-                    self._tqdm_obj.close()
-                if refresh:
-                    self._tqdm_obj.refresh()
+                # Updating, formatting the postfix of and refreshing the tqdm
+                # object on every iteration adds a significant overhead for
+                # fast chain iterations, therefore updates are batched with
+                # the tqdm object only updated at most every min_refresh_time
+                # seconds and on the final iteration
+                if iter == self._n_iter or (
+                        timer() - self._last_refresh_time >
+                        self._min_refresh_time):
+                    self._tqdm_obj.update(iter - self._tqdm_obj.n)
+                    if self._stats_dict:
+                        self._tqdm_obj.set_postfix(
+                            self._stats_dict, refresh=False)
+                    if iter == self._n_iter:
+                        self._tqdm_obj.close()
+                    if refresh:
+                        self._tqdm_obj.refresh()
+                    self._last_refresh_time = timer()
 
         def __enter__(self):
             self._tqdm_obj = tqdm.trange(
                 self._n_iter, desc=self._description,
-                position=self._position[0]).__enter__()
+                position=self._position[0],
+                mininterval=self._min_refresh_time).__enter__()
             return self
 
         def __exit__(self, *args):
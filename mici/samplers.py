@@ -274,6 +274,9 @@ def _update_monitor_stats(
                 f'Statistics key pair {(trans_key, stats_key)} to be monitored'
                 'is not present in chain statistics returned by transitions.')
         val = chain_stats[trans_key][stats_key][sample_index]
+        if np.ndim(val) > 0:
+            # Monitor mean of statistics recorded per chain in a batch
+            val = val.mean()
         if stats_key not in monitor_dict:
             monitor_dict[stats_key] = val
         else:
@@ -326,7 +329,7 @@ def _sample_chain(init_state, chain_iterator, rng, transitions, trace_funcs,
             is iterated over to produce sample indices and (empty) iteration
             statistic dictionaries to output monitored chain statistics to
             during sampling.
-        rng (RandomState): Numpy RandomState random number generator.
+        rng (Generator): Numpy random number generator.
         transitions (OrderedDict[str, Transition]): Ordered dictionary of
             Markov transitions kernels to sequentially sample from on each
             chain iteration.
@@ -390,6 +393,12 @@ def _sample_chain(init_state, chain_iterator, rng, transitions, trace_funcs,
         transitions, n_sample, memmap_enabled, memmap_path, chain_index)
     traces = _init_traces(
         trace_funcs, state, n_sample, memmap_enabled, memmap_path, chain_index)
+    # For the common case of only tracing the position component write
+    # directly to the trace array rather than calling the trace function
+    if len(trace_funcs) == 1 and trace_funcs[0] is _pos_trace_func:
+        pos_trace = traces['pos']
+    else:
+        pos_trace = None
     try:
         sample_index = 0
         if parallel_chains and not memmap_enabled:
@@ -400,9 +409,12 @@ def _sample_chain(init_state, chain_iterator, rng, transitions, trace_funcs,
                     state, trans_stats = transition.sample(state, rng)
                     _update_chain_stats(
                         sample_index, chain_stats, trans_key, trans_stats)
-                for trace_func in trace_funcs:
-                    for key, val in trace_func(state).items():
-                        traces[key][sample_index] = val
+                if pos_trace is not None:
+                    pos_trace[sample_index] = state.pos
+                else:
+                    for trace_func in trace_funcs:
+                        for key, val in trace_func(state).items():
+                            traces[key][sample_index] = val
                 if monitor_stats is not None:
                     _update_monitor_stats(
                         sample_index, chain_stats, monitor_stats, monitor_dict)
@@ -468,10 +480,13 @@ def _get_per_chain_rngs(base_rng, n_chain):
     """Construct random number generators (RNGs) for each of a set of chains.
 
     If NumPy version >= 1.17 is available with updated random generator
-    interface, then if the base RNG bit generator has a `jumped` method this is
-    used to produce a sequence of independent random substreams. Otherwise if
-    the base RNG bit generator has a `_seed_sequence` attribute this is used
-    to spawn a sequence of generators.
+    interface, then if the base RNG bit generator has a seed sequence this is
+    used to spawn a sequence of independent child seed sequences to seed a
+    generator for each chain. As spawning advances the state of the parent
+    seed sequence, repeated calls with the same base RNG produce new
+    independent generators. Otherwise if the base RNG bit generator has a
+    `jumped` method this is used to produce a sequence of independent random
+    substreams.
 
     Alternatively if the base RNG supports a `jump` method, as for generator
     classes from the `randomgen` module, this is used to produce independent
@@ -482,15 +497,13 @@ def _get_per_chain_rngs(base_rng, n_chain):
     As a final fallback, a set of `numpy.Randomstate` objects with seeds
     independently generated from the base RNG is used.
     """
-    if (NUMPY_DEFAULT_RNG_AVAILABLE and hasattr(base_rng, 'bit_generator') and
-            hasattr(base_rng.bit_generator, 'jumped')):
-        bit_generator = base_rng.bit_generator
-        return [default_rng(bit_generator.jumped(i)) for i in range(n_chain)]
-    elif (NUMPY_DEFAULT_RNG_AVAILABLE and hasattr(base_rng, 'bit_generator')
-            and hasattr(base_rng.bit_generator, '_seeq_seq')):
-        seed_sequence = base_rng.bit_generator._seeq_seq
-        seeds = seed_sequence.spawn(n_chain)
-        return [default_rng(seed) for seed in seeds]
+    bit_generator = getattr(base_rng, 'bit_generator', None)
+    seed_sequence = getattr(bit_generator, '_seed_seq', None)
+    if NUMPY_DEFAULT_RNG_AVAILABLE and hasattr(seed_sequence, 'spawn'):
+        return [default_rng(seed) for seed in seed_sequence.spawn(n_chain)]
+    elif NUMPY_DEFAULT_RNG_AVAILABLE and hasattr(bit_generator, 'jumped'):
+        return [default_rng(bit_generator.jumped(i + 1))
+                for i in range(n_chain)]
     elif hasattr(base_rng, 'jump'):
         return [base_rng.jump(i).generator for i in range(n_chain)]
     elif RANDOMGEN_AVAILABLE:
@@ -555,6 +568,10 @@ def _sample_chains_parallel(init_states, rngs, chain_iterators, n_process,
     """Sample multiple chains in parallel over multiple processes."""
     n_samples = [len(it) for it in chain_iterators]
     n_chain = len(chain_iterators)
+    if n_process is None:
+        n_process = os.cpu_count()
+    # No benefit in starting more worker processes than there are chains
+    n_process = min(n_process, n_chain)
     with ignore_sigint_manager() as manager, Pool(n_process) as pool:
         results = None
         try:
@@ -638,7 +655,7 @@ class MarkovChainMonteCarloMethod(object):
     def __init__(self, rng, transitions):
         """
         Args:
-            rng (RandomState): Numpy RandomState random number generator.
+            rng (Generator): Numpy random number generator.
             transitions (OrderedDict[str, Transition]): Ordered dictionary of
                 Markov transitions kernels to sequentially sample from on each
                 chain iteration.
@@ -880,7 +897,7 @@ class HamiltonianMCMC(MarkovChainMonteCarloMethod):
         """
         Args:
             system (mici.systems.System): Hamiltonian system to be simulated.
-            rng (RandomState): Numpy RandomState random number generator.
+            rng (Generator): Numpy random number generator.
             integration_transition (mici.transitions.IntegrationTransition):
                 Markov transition kernel which leaves canonical distribution
                 invariant and jointly updates the position and momentum
@@ -1119,7 +1136,7 @@ class StaticMetropolisHMC(HamiltonianMCMC):
         """
         Args:
             system (mici.systems.System): Hamiltonian system to be simulated.
-            rng (RandomState): Numpy RandomState random number generator.
+            rng (Generator): Numpy random number generator.
             integrator (mici.integrators.Integrator): Symplectic integrator to
                 use to simulate dynamics in integration transition.
             n_step (int): Number of integrator steps to simulate in each
@@ -1145,10 +1162,69 @@ class StaticMetropolisHMC(HamiltonianMCMC):
 
     @n_step.setter
     def n_step(self, value):
-        assert value > 0, 'n_step must be non-negative'
+        assert value > 0, 'n_step must be positive'
         self.transitions['integration_transition'].n_step = value
 
 
+class BatchedStaticMetropolisHMC(StaticMetropolisHMC):
+    """Static integration time H-MCMC for a batch of independent chains.
+
+    Equivalent to running `n_chain` independent `StaticMetropolisHMC` chains,
+    but with the state of all chains stored in a single `ChainState` with
+    position and momentum components of shape `(n_chain, n_dim)`, such that
+    the Hamiltonian system functions are evaluated for all chains in a single
+    vectorised call in each integrator step. The system should support batched
+    states, for example a `mici.systems.BatchedEuclideanMetricSystem` instance.
+
+    The traces returned by the `sample_chain` method have shape
+    `(n_sample, n_chain, ...)` and the chain statistics shape
+    `(n_sample, n_chain)`.
+    """
+
+    def __init__(self, system, integrator, rng, n_step, n_chain,
+                 momentum_transition=None):
+        """
+        Args:
+            system (mici.systems.System): Hamiltonian system to be simulated.
+                Must support batched states with position and momentum arrays
+                of shape `(n_chain, n_dim)`.
+            rng (Generator): Numpy random number generator.
+            integrator (mici.integrators.Integrator): Symplectic integrator to
+                use to simulate dynamics in integration transition.
+            n_step (int): Number of integrator steps to simulate in each
+                integration transition.
+            n_chain (int): Number of independent chains in batch.
+            momentum_transition (None or mici.transitions.MomentumTransition):
+                Markov transition kernel which leaves the conditional
+                distribution on the momentum under the canonical distribution
+                invariant, updating only the momentum component of the chain
+                state. If set to `None` the momentum transition operator
+                `mici.transitions.IndependentMomentumTransition` will be used,
+                which independently samples the momentum from its conditional
+                distribution.
+        """
+        self.n_chain = n_chain
+        integration_transition = (
+            trans.BatchedMetropolisStaticIntegrationTransition(
+                system, integrator, n_step, n_chain))
+        # Skip StaticMetropolisHMC initialiser as it constructs an unbatched
+        # integration transition
+        HamiltonianMCMC.__init__(
+            self, system, rng, integration_transition, momentum_transition)
+
+    def _preprocess_init_state(self, init_state):
+        """Make sure initial state is a batched ChainState with momentum."""
+        if isinstance(init_state, np.ndarray):
+            init_state = ChainState(
+                pos=init_state, mom=None, dir=np.ones((self.n_chain, 1)))
+        init_state = super()._preprocess_init_state(init_state)
+        if init_state.pos.shape[0] != self.n_chain:
+            raise ValueError(
+                f'init_state position should have leading dimension of size '
+                f'n_chain={self.n_chain}.')
+        return init_state
+
+
 class RandomMetropolisHMC(HamiltonianMCMC):
     """Random integration time H-MCMC with Metropolis sampling of new state.
 
@@ -1182,7 +1258,7 @@ class RandomMetropolisHMC(HamiltonianMCMC):
         """
         Args:
             system (mici.systems.System): Hamiltonian system to be simulated.
-            rng (RandomState): Numpy RandomState random number generator.
+            rng (Generator): Numpy random number generator.
             integrator (mici.integrators.Integrator): Symplectic integrator to
                 use to simulate dynamics in integration transition.
             n_step_range (Tuple[int, int]): Tuple `(lower, upper)` with two
@@ -1250,7 +1326,7 @@ class DynamicMultinomialHMC(HamiltonianMCMC):
         """
         Args:
             system (mici.systems.System): Hamiltonian system to be simulated.
-            rng (RandomState): Numpy RandomState random number generator.
+            rng (Generator): Numpy random number generator.
             integrator (mici.integrators.Integrator): Symplectic integrator to
                 use to simulate dynamics in integration transition.
             max_tree_depth (int): Maximum depth to expand trajectory binary
@@ -1350,7 +1426,7 @@ class DynamicSliceHMC(HamiltonianMCMC):
         """
         Args:
             system (mici.systems.System): Hamiltonian system to be simulated.
-            rng (RandomState): Numpy RandomState random number generator.
+            rng (Generator): Numpy random number generator.
             integrator (mici.integrators.Integrator): Symplectic integrator to
                 use to simulate dynamics in integration transition.
             max_tree_depth (int): Maximum depth to expand trajectory binary
@@ -138,8 +138,17 @@ class ChainState(object):
     def __contains__(self, name):
         return name in self._variables
 
-    def copy(self):
-        """Create a deep copy of the state object.
+    def copy(self, share_variables=False):
+        """Create a copy of the state object.
+
+        Args:
+            share_variables (bool): Whether the copy should share the variable
+                values (e.g. position and momentum arrays) of the original
+                object rather than copies of them. In this case variables of
+                the copy should only be updated by assigning new values to the
+                corresponding attributes, as in-place updates of a shared
+                array will also change the original object's variables. This
+                avoids the cost of copying arrays which will be replaced.
 
         Returns:
             state_copy (ChainState): A copy of the state object which can be
@@ -148,7 +157,9 @@ class ChainState(object):
         return type(self)(
             _dependencies=self._dependencies, _cache=self._cache.copy(),
             _call_counts=self._call_counts,
-            **{name: copy.copy(val) for name, val in self._variables.items()})
+            **(self._variables if share_variables else
+               {name: copy.copy(val)
+                for name, val in self._variables.items()}))
 
     def __str__(self):
         return (
@@ -1,6 +1,7 @@
 """Hamiltonian systems encapsulating energy functions and their derivatives."""
 
 from abc import ABC, abstractmethod
+import importlib.util
 import logging
 import numpy as np
 from mici.states import cache_in_state, multi_cache_in_state
@@ -11,6 +12,18 @@ from mici.matrices import (
     EigendecomposedSymmetricMatrix, SoftAbsRegularisedPositiveDefiniteMatrix)
 from mici.autodiff import autodiff_fallback
 
+# JAX is only imported when constructing a JAX system as it is slow to import
+JAX_AVAILABLE = importlib.util.find_spec('jax') is not None
+
+
+def _double_precision_inner_product(vec_1, vec_2):
+    """Compute inner product of two vectors accumulating in double precision.
+    """
+    if vec_1.dtype == vec_2.dtype == np.float64:
+        return vec_1 @ vec_2
+    else:
+        return np.sum(vec_1 * vec_2, dtype=np.float64)
+
 
 class System(ABC):
     r"""Base class for Hamiltonian systems.
@@ -91,7 +104,9 @@ class System(ABC):
         Returns:
             float: Value of `h1` Hamiltonian component.
         """
-        return self.neg_log_dens(state)
+        # Cast to double precision so that differences in Hamiltonian values
+        # are accurate even when the state is simulated in single precision
+        return np.float64(self.neg_log_dens(state))
 
     def dh1_dpos(self, state):
         """Derivative of `h1` Hamiltonian component with respect to position.
@@ -107,13 +122,16 @@ class System(ABC):
     def h1_flow(self, state, dt):
         """Apply exact flow map corresponding to `h1` Hamiltonian component.
 
-        `state` argument is modified in place.
+        `state` argument is modified in place, with the updated state variable
+        values assigned as new arrays rather than updating the existing arrays
+        in place as these may be shared with other state objects.
 
         Args:
             state (mici.states.ChainState): State to start flow at.
             dt (float): Time interval to simulate flow for.
         """
-        state.mom -= dt * self.dh1_dpos(state)
+        state.mom = np.subtract(
+            state.mom, dt * self.dh1_dpos(state), dtype=state.mom.dtype)
 
     @abstractmethod
     def h2(self, state):
@@ -206,6 +224,14 @@ class EuclideanMetricSystem(System):
 
     where \(\ell(q)\) is the negative log (unnormalised) density of
     the target distribution with respect to the Lebesgue measure.
+
+    The position and momentum components of states are simulated in the
+    floating point precision of the initial position array, so for example
+    using a single precision (`float32`) initial position halves the memory
+    used for and moved when updating the state arrays. The \(h_1\) and
+    \(h_2\) Hamiltonian components are always returned in double precision,
+    with \(h_2\) accumulated in double precision, so that Metropolis
+    acceptance probabilities remain accurate.
     """
 
     def __init__(self, neg_log_dens, metric=None, grad_neg_log_dens=None):
@@ -257,7 +283,8 @@ class EuclideanMetricSystem(System):
 
     @cache_in_state('mom')
     def h2(self, state):
-        return 0.5 * state.mom @ (self.metric.inv @ state.mom)
+        return 0.5 * _double_precision_inner_product(
+            state.mom, self.metric.inv @ state.mom)
 
     @cache_in_state('mom')
     def dh2_dmom(self, state):
@@ -266,13 +293,16 @@ class EuclideanMetricSystem(System):
     def h2_flow(self, state, dt):
         """Apply exact flow map corresponding to `h2` Hamiltonian component.
 
-        `state` argument is modified in place.
+        `state` argument is modified in place, with the updated state variable
+        values assigned as new arrays rather than updating the existing arrays
+        in place as these may be shared with other state objects.
 
         Args:
             state (mici.states.ChainState): State to start flow at.
             dt (float): Time interval to simulate flow for.
         """
-        state.pos += dt * self.dh2_dmom(state)
+        state.pos = np.add(
+            state.pos, dt * self.dh2_dmom(state), dtype=state.pos.dtype)
 
     def dh2_flow_dmom(self, dt):
         """Derivatives of `h2_flow` flow map with respect to input momentum.
@@ -291,7 +321,199 @@ class EuclideanMetricSystem(System):
         return dt * self.metric.inv, IdentityMatrix(self.metric.shape[0])
 
     def sample_momentum(self, state, rng):
-        return self.metric.sqrt @ rng.standard_normal(state.pos.shape)
+        mom = self.metric.sqrt @ rng.standard_normal(state.pos.shape)
+        return mom.astype(state.pos.dtype, copy=False)
+
+
+class BatchedEuclideanMetricSystem(EuclideanMetricSystem):
+    r"""Euclidean metric Hamiltonian system for a batch of independent chains.
+
+    The position and momentum components of states of this system are arrays
+    of shape `(n_chain, n_dim)`, with each row corresponding to the state of
+    one of a batch of independent chains. The Hamiltonian function then
+    returns an array of shape `(n_chain,)` of per-chain values, with the
+    \(h_2\) Hamiltonian component for each chain being
+
+    \[ h_2(q, p) = \frac{1}{2} p^T M^{-1} p \]
+
+    where \(q\) and \(p\) are the position and momentum of the chain
+    respectively and \(M\) the matrix representation of the metric shared by
+    all chains.
+
+    The `neg_log_dens` function should accept a `(n_chain, n_dim)` position
+    array and return a `(n_chain,)` array of negative log density values, with
+    `grad_neg_log_dens` correspondingly returning a `(n_chain, n_dim)` array.
+    Evaluating the functions on all chains in a single vectorised call avoids
+    the interpreter overhead of evaluating them for each chain separately.
+    """
+
+    @cache_in_state('mom')
+    def h2(self, state):
+        return 0.5 * np.sum(
+            state.mom * (state.mom @ self.metric.inv), -1, dtype=np.float64)
+
+    @cache_in_state('mom')
+    def dh2_dmom(self, state):
+        return state.mom @ self.metric.inv
+
+    def sample_momentum(self, state, rng):
+        mom = rng.standard_normal(state.pos.shape) @ self.metric.sqrt.T
+        return mom.astype(state.pos.dtype, copy=False)
+
+
+class _JaxModelFunctions(object):
+    """JAX compiled negative log density and gradient functions of a model.
+
+    Compiled functions cannot be pickled, so when pickling only the original
+    negative log density function is recorded, with the functions compiled
+    again when unpickling.
+    """
+
+    def __init__(self, neg_log_dens, batched):
+        """
+        Args:
+            neg_log_dens (Callable[[array], float]): Function which given a
+                position array returns the negative logarithm of an
+                unnormalised probability density, defined using the
+                `jax.numpy` interface.
+            batched (bool): Whether to vectorise the functions over a leading
+                batch (chain) dimension of the position array using
+                `jax.vmap`.
+        """
+        import jax
+        self._raw_neg_log_dens = neg_log_dens
+        self._batched = batched
+        value_and_grad = jax.value_and_grad(neg_log_dens)
+        if batched:
+            neg_log_dens = jax.vmap(neg_log_dens)
+            value_and_grad = jax.vmap(value_and_grad)
+        self._jit_neg_log_dens = jax.jit(neg_log_dens)
+        # Operates on and returns JAX arrays for use in compiled loops
+        self.jit_value_and_grad_neg_log_dens = jax.jit(value_and_grad)
+
+    def neg_log_dens(self, pos):
+        """Compiled negative log density function returning NumPy values."""
+        return np.asarray(self._jit_neg_log_dens(pos))[()]
+
+    def grad_neg_log_dens(self, pos):
+        """Compiled function returning negative log density gradient and value.
+        """
+        value, grad = self.jit_value_and_grad_neg_log_dens(pos)
+        return np.asarray(grad), np.asarray(value)[()]
+
+    def __getstate__(self):
+        return {'neg_log_dens': self._raw_neg_log_dens,
+                'batched': self._batched}
+
+    def __setstate__(self, state):
+        self.__init__(state['neg_log_dens'], state['batched'])
+
+
+class JaxEuclideanMetricSystem(EuclideanMetricSystem):
+    """Euclidean metric Hamiltonian system with model functions using JAX.
+
+    The negative log density function should be defined using the `jax.numpy`
+    interface. It is compiled with `jax.jit` and its gradient is computed
+    using `jax.value_and_grad`. States of this system use NumPy arrays, so it
+    can be used with any sampler that supports
+    `mici.systems.EuclideanMetricSystem`. When used with
+    `mici.integrators.ExplicitLeapfrogIntegrator`, all the integrator steps in
+    a Metropolis integration transition are simulated in one compiled JAX
+    loop.
+
+    JAX uses single precision floating point by default. To sample in
+    double precision the `jax_enable_x64` configuration option must be set
+    before constructing the system.
+
+    Only the original negative log density function is pickled with the
+    system, with the model functions compiled again when unpickled. The
+    system can therefore be used when sampling chains in multiple processes
+    if the negative log density function can be pickled.
+
+    See documentation of `EuclideanMetricSystem` for more general details
+    about Euclidean-metric Hamiltonian systems.
+    """
+
+    def __init__(self, neg_log_dens, metric=None):
+        """
+        Args:
+            neg_log_dens (Callable[[array], float]): Function which given a
+                position array returns the negative logarithm of an
+                unnormalised probability density on the position space with
+                respect to the Lebesgue measure, with the corresponding
+                distribution on the position space being the target
+                distribution it is wished to draw approximate samples from.
+                Must be defined using the `jax.numpy` interface.
+            metric (None or array or PositiveDefiniteMatrix): Matrix object
+                corresponding to matrix representation of metric on position
+                space and covariance of Gaussian marginal distribution on
+                momentum vector. If `None` is passed (the default), the
+                identity matrix will be used. If a 1D array is passed then this
+                is assumed to specify a metric with positive diagonal matrix
+                representation and the array the matrix diagonal. If a 2D array
+                is passed then this is assumed to specify a metric with a dense
+                positive definite matrix representation specified by the array.
+                Otherwise if the value is a subclass of
+                `mici.matrices.PositiveDefiniteMatrix` it is assumed to
+                directly specify the metric matrix representation.
+        """
+        if not JAX_AVAILABLE:
+            raise ImportError(
+                f'JAX must be installed to use {type(self).__name__}.')
+        self._jax_model_functions = _JaxModelFunctions(
+            neg_log_dens, batched=False)
+        super().__init__(
+            self._jax_model_functions.neg_log_dens, metric,
+            self._jax_model_functions.grad_neg_log_dens)
+
+
+class BatchedJaxEuclideanMetricSystem(BatchedEuclideanMetricSystem):
+    """Euclidean metric system for a batch of chains with model using JAX.
+
+    The negative log density function should be defined for a single chain
+    position using the `jax.numpy` interface. It is vectorised over the chains
+    in a batch using `jax.vmap` and compiled with `jax.jit`, with its gradient
+    computed using `jax.value_and_grad`. When used with
+    `mici.integrators.ExplicitLeapfrogIntegrator`, the integrator steps of all
+    chains in a batched Metropolis integration transition are simulated in one
+    compiled JAX loop.
+
+    JAX uses single precision floating point by default. To sample in
+    double precision the `jax_enable_x64` configuration option must be set
+    before constructing the system.
+
+    Only the original negative log density function is pickled with the
+    system, with the model functions compiled again when unpickled. The
+    system can therefore be used when sampling chains in multiple processes
+    if the negative log density function can be pickled.
+
+    See documentation of `BatchedEuclideanMetricSystem` for more details about
+    the batched system state and function shapes.
+    """
+
+    def __init__(self, neg_log_dens, metric=None):
+        """
+        Args:
+            neg_log_dens (Callable[[array], float]): Function which given a
+                position array for a single chain returns the negative
+                logarithm of an unnormalised probability density on the
+                position space with respect to the Lebesgue measure, with the
+                corresponding distribution on the position space being the
+                target distribution it is wished to draw approximate samples
+                from. Must be defined using the `jax.numpy` interface.
+            metric (None or array or PositiveDefiniteMatrix): Matrix object
+                corresponding to matrix representation of metric shared by all
+                chains. See documentation of `EuclideanMetricSystem` for
+                details of the accepted values.
+        """
+        if not JAX_AVAILABLE:
+            raise ImportError(
+                f'JAX must be installed to use {type(self).__name__}.')
+        self._jax_model_functions = _JaxModelFunctions(
+            neg_log_dens, batched=True)
+        super().__init__(
+            self._jax_model_functions.neg_log_dens, metric,
+            self._jax_model_functions.grad_neg_log_dens)
 
 
 class GaussianEuclideanMetricSystem(EuclideanMetricSystem):
@@ -365,8 +587,10 @@ class GaussianEuclideanMetricSystem(EuclideanMetricSystem):
         super().__init__(neg_log_dens, metric, grad_neg_log_dens)
 
     def h2(self, state):
-        return (0.5 * state.pos @ state.pos +
-                0.5 * state.mom @ self.metric.inv @ state.mom)
+        return 0.5 * (
+            _double_precision_inner_product(state.pos, state.pos) +
+            _double_precision_inner_product(
+                state.mom, self.metric.inv @ state.mom))
 
     @cache_in_state('mom')
     def dh2_dmom(self, state):
@@ -381,12 +605,14 @@ class GaussianEuclideanMetricSystem(EuclideanMetricSystem):
         sin_omega_dt, cos_omega_dt = np.sin(omega * dt), np.cos(omega * dt)
         eigvec_T_pos = self.metric.eigvec.T @ state.pos
         eigvec_T_mom = self.metric.eigvec.T @ state.mom
-        state.pos = self.metric.eigvec @ (
+        state.pos = (self.metric.eigvec @ (
             cos_omega_dt * eigvec_T_pos +
-            (sin_omega_dt * omega) * eigvec_T_mom)
-        state.mom = self.metric.eigvec @ (
+            (sin_omega_dt * omega) * eigvec_T_mom)).astype(
+                state.pos.dtype, copy=False)
+        state.mom = (self.metric.eigvec @ (
             cos_omega_dt * eigvec_T_mom -
-            (sin_omega_dt / omega) * eigvec_T_pos)
+            (sin_omega_dt / omega) * eigvec_T_pos)).astype(
+                state.mom.dtype, copy=False)
 
     def dh2_flow_dmom(self, dt):
         omega = 1. / self.metric.eigval**0.5
@@ -1158,6 +1384,7 @@ class RiemannianMetricSystem(System):
         return 0.5 * vjp_metric(
             self.metric(state).grad_quadratic_form_inv(state.mom))
 
+    @cache_in_state('pos', 'mom')
     def dh2_dmom(self, state):
         return self.metric(state).inv @ state.mom
 
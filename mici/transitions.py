@@ -2,16 +2,66 @@
 
 from abc import ABC, abstractmethod, abstractproperty
 from collections import namedtuple
-from functools import partial
+from functools import lru_cache, partial
+import importlib.util
+from math import exp, inf, isnan, log1p
 import logging
 import numpy as np
-from mici.utils import LogRepFloat
 from mici.errors import (
     Error, NonReversibleStepError, ConvergenceError, HamiltonianDivergenceError)
+from mici.integrators import _cache_grad_neg_log_dens
+
+# Numba is only imported when constructing a dynamic integration transition as
+# it is slow to import
+NUMBA_AVAILABLE = importlib.util.find_spec('numba') is not None
 
 logger = logging.getLogger(__name__)
 
 
+def _either_inner_product_negative(vec_1, vec_2, vec):
+    """Check if inner product of `vec_1` or `vec_2` with `vec` is negative."""
+    return np.vdot(vec_1, vec) < 0 or np.vdot(vec_2, vec) < 0
+
+
+def _merge_log_weights_and_sum_moms(log_weight_1, log_weight_2,
+                                    sum_mom_1, sum_mom_2, sum_mom_out):
+    """Sum subtree momentum sums into `sum_mom_out` and merge log weights."""
+    np.add(sum_mom_1, sum_mom_2, out=sum_mom_out)
+    return np.logaddexp(log_weight_1, log_weight_2)
+
+
+@lru_cache(maxsize=None)
+def _use_numba_tree_functions():
+    """Replace subtree merge and inner product functions with Numba versions.
+
+    Has no effect if Numba is not available, with the replacement only
+    performed on the first call.
+    """
+    global _either_inner_product_negative, _merge_log_weights_and_sum_moms
+    if not NUMBA_AVAILABLE:
+        return
+    import numba
+
+    @numba.njit(cache=True)
+    def either_inner_product_negative(vec_1, vec_2, vec):
+        vec_1, vec_2, vec = vec_1.ravel(), vec_2.ravel(), vec.ravel()
+        inner_product_1 = 0.
+        inner_product_2 = 0.
+        for i in range(vec.shape[0]):
+            inner_product_1 += vec_1[i] * vec[i]
+            inner_product_2 += vec_2[i] * vec[i]
+        return inner_product_1 < 0 or inner_product_2 < 0
+
+    @numba.njit(cache=True)
+    def merge_log_weights_and_sum_moms(log_weight_1, log_weight_2,
+                                       sum_mom_1, sum_mom_2, sum_mom_out):
+        np.add(sum_mom_1, sum_mom_2, sum_mom_out)
+        return np.logaddexp(log_weight_1, log_weight_2)
+
+    _either_inner_product_negative = either_inner_product_negative
+    _merge_log_weights_and_sum_moms = merge_log_weights_and_sum_moms
+
+
 def _process_integrator_error(exception, stats):
     logger.info(f'Terminating trajectory due to error:\n{exception!s}')
     # Only set stats fields to True if exception is of matching type.
@@ -55,7 +105,7 @@ class Transition(ABC):
         Args:
             state (mici.states.ChainState): Current chain state to condition
                 transition kernel on.
-            rng (RandomState): NumPy RandomState random number generator.
+            rng (Generator): NumPy random number generator.
 
         Returns:
             state (mici.states.ChainState): Updated state object.
@@ -95,7 +145,7 @@ class MomentumTransition(Transition):
         Args:
             state (mici.states.ChainState): Current chain state to sample new
                 momentum (momentum updated in place).
-            rng (RandomState): NumPy RandomState random number generator.
+            rng (Generator): NumPy random number generator.
 
         Returns:
             state (mici.states.ChainState): Updated state object.
@@ -155,17 +205,31 @@ class CorrelatedMomentumTransition(MomentumTransition):
                 momentum resampling coefficient.
         """
         super().__init__(system)
-        assert mom_resample_coeff >= 0 and mom_resample_coeff <= 1, (
-            'mom_resample_coeff should have a value in the interval [0, 1].')
         self.mom_resample_coeff = mom_resample_coeff
 
+    @property
+    def mom_resample_coeff(self):
+        """Scalar value in [0, 1] defining momentum resampling coefficient."""
+        return self._mom_resample_coeff
+
+    @mom_resample_coeff.setter
+    def mom_resample_coeff(self, value):
+        assert value >= 0 and value <= 1, (
+            'mom_resample_coeff should have a value in the interval [0, 1].')
+        self._mom_resample_coeff = value
+        # Precompute coefficient previous momentum value is scaled by
+        self._mom_scale = (1. - value**2)**0.5
+
     def sample(self, state, rng):
-        if self.mom_resample_coeff == 1:
+        if self._mom_resample_coeff == 1:
             state.mom = self.system.sample_momentum(state, rng)
-        elif self.mom_resample_coeff != 0:
+        elif self._mom_resample_coeff != 0:
             mom_ind = self.system.sample_momentum(state, rng)
-            state.mom *= (1. - self.mom_resample_coeff**2)**0.5
-            state.mom += self.mom_resample_coeff * mom_ind
+            # Update momentum in place to avoid allocating temporary arrays
+            mom = state.mom
+            mom *= self._mom_scale
+            mom += np.multiply(self._mom_resample_coeff, mom_ind, out=mom_ind)
+            state.mom = mom
         return state, None
 
 
@@ -183,8 +247,8 @@ class IntegrationTransition(Transition):
         'hamiltonian': (np.float64, np.nan),
         'n_step': (np.int64, -1),
         'accept_prob': (np.float64, np.nan),
-        'non_reversible_step': (np.bool, False),
-        'convergence_error': (np.bool, False)
+        'non_reversible_step': (np.bool_, False),
+        'convergence_error': (np.bool_, False)
     }
 
     def __init__(self, system, integrator):
@@ -207,7 +271,7 @@ class IntegrationTransition(Transition):
 
         Args:
             state (mici.states.ChainState): Current chain state.
-            rng (RandomState): NumPy RandomState random number generator.
+            rng (Generator): NumPy random number generator.
 
         Returns:
             state (mici.states.ChainState): Updated state object.
@@ -234,22 +298,46 @@ class MetropolisIntegrationTransition(IntegrationTransition):
 
     def _sample_n_step(self, state, n_step, rng):
         h_init = self.system.h(state)
-        state_p = state
-        try:
-            for s in range(n_step):
-                state_p = self.integrator.step(state_p)
-        except Error as e:
-            stats = {'hamiltonian': h_init, 'accept_prob': 0, 'n_step': s}
-            _process_integrator_error(e, stats)
-            return state, stats
+        if getattr(self.integrator, 'can_jit_multi_step', False):
+            # Simulate all steps in a single compiled loop. Non-finite values
+            # are signalled by a flag rather than an exception in this case.
+            state_p, valid = self.integrator.jit_multi_step(state, n_step)
+            if not valid:
+                stats = {'hamiltonian': h_init, 'accept_prob': 0,
+                         'n_step': n_step}
+                return state, stats
+        else:
+            state_p = state
+            try:
+                for s in range(n_step):
+                    state_p = self.integrator.step(state_p)
+            except Error as e:
+                stats = {'hamiltonian': h_init, 'accept_prob': 0, 'n_step': s}
+                _process_integrator_error(e, stats)
+                return state, stats
         state_p.dir *= -1
         h_final = self.system.h(state_p)
-        metrop_ratio = np.exp(h_init - h_final)
-        accept_prob = 0 if np.isnan(metrop_ratio) else min(1, metrop_ratio)
-        if rng.uniform() < accept_prob:
-            state = state_p
+        # Moves which do not increase the Hamiltonian are always accepted
+        # without drawing a uniform variate. Scalar math module functions are
+        # used in preference to NumPy equivalents to avoid array dispatch
+        # overhead, with exp only evaluated for negative arguments so that it
+        # cannot overflow. A NaN Hamiltonian difference fails both
+        # comparisons and so gives a zero acceptance probability.
+        delta_h = h_init - h_final
+        if delta_h >= 0:
+            accept_prob = 1.
+        elif delta_h < 0:
+            accept_prob = exp(delta_h)
+        else:
+            accept_prob = 0.
+        # Hamiltonian is independent of the integration direction so reuse
+        # the already computed values rather than re-evaluating
+        if delta_h >= 0 or rng.random() < accept_prob:
+            state, h = state_p, h_final
+        else:
+            h = h_init
         state.dir *= -1
-        stats = {'hamiltonian': self.system.h(state),
+        stats = {'hamiltonian': h,
                  'accept_prob': accept_prob, 'n_step': n_step,
                  'non_reversible_step': False, 'convergence_error': False}
         return state, stats
@@ -325,10 +413,92 @@ class MetropolisRandomIntegrationTransition(MetropolisIntegrationTransition):
         self.n_step_range = n_step_range
 
     def sample(self, state, rng):
-        n_step = rng.random_integers(*self.n_step_range)
+        n_step_lower, n_step_upper = self.n_step_range
+        if hasattr(rng, 'integers'):
+            n_step = rng.integers(n_step_lower, n_step_upper + 1)
+        else:
+            # Fall back to legacy interface for `RandomState` instances
+            n_step = rng.randint(n_step_lower, n_step_upper + 1)
         return self._sample_n_step(state, n_step, rng)
 
 
+class BatchedMetropolisStaticIntegrationTransition(
+        MetropolisStaticIntegrationTransition):
+    """Static integration transition for a batch of independent chains.
+
+    The position and momentum components of the chain state are assumed to be
+    arrays of shape `(n_chain, n_dim)` and the integration direction an array
+    of shape `(n_chain, 1)`, with each row corresponding to an independent
+    chain, for example states of a `mici.systems.BatchedEuclideanMetricSystem`
+    instance. The trajectories of all chains are simulated together, with the
+    system Hamiltonian and its derivatives evaluated for the whole batch in
+    each integrator step, and an independent Metropolis accept step then
+    performed for each chain. All statistics are recorded per chain.
+    """
+
+    def __init__(self, system, integrator, n_step, n_chain):
+        """
+        Args:
+            system (mici.systems.System): Hamiltonian system to be simulated.
+            integrator (mici.integrators.Integrator): Symplectic integrator
+                appropriate to the specified Hamiltonian system.
+            n_step (int): Number of integrator steps to simulate in each
+                transition.
+            n_chain (int): Number of chains in batch.
+        """
+        super().__init__(system, integrator, n_step)
+        self.n_chain = n_chain
+        self.statistic_types = {
+            'hamiltonian': (np.dtype((np.float64, (n_chain,))), np.nan),
+            'n_step': (np.dtype((np.int64, (n_chain,))), -1),
+            'accept_prob': (np.dtype((np.float64, (n_chain,))), np.nan),
+            'non_reversible_step': (np.dtype((np.bool_, (n_chain,))), False),
+            'convergence_error': (np.dtype((np.bool_, (n_chain,))), False)
+        }
+
+    def _sample_n_step(self, state, n_step, rng):
+        h_init = self.system.h(state)
+        if getattr(self.integrator, 'can_jit_multi_step', False):
+            # Simulate all steps in a single compiled loop, with chains for
+            # which non-finite values are encountered flagged as invalid
+            state_p, valid = self.integrator.jit_multi_step(state, n_step)
+        else:
+            state_p = state
+            valid = np.ones(self.n_chain, dtype=bool)
+            try:
+                for s in range(n_step):
+                    state_p = self.integrator.step(state_p)
+            except Error as e:
+                stats = {'hamiltonian': h_init, 'accept_prob': 0, 'n_step': s}
+                _process_integrator_error(e, stats)
+                return state, stats
+        # Direction array may be shared with state so negate out of place
+        state_p.dir = -state_p.dir
+        h_final = self.system.h(state_p)
+        with np.errstate(over='ignore', invalid='ignore'):
+            accept_prob = np.exp(np.minimum(0, h_init - h_final))
+        accept_prob[np.isnan(accept_prob) | ~valid] = 0
+        accept = rng.random(size=self.n_chain) < accept_prob
+        # Updating the state variables clears the state cache so select the
+        # negative log density gradient and value of each chain beforehand
+        grad = np.where(
+            accept[:, None], self.system.grad_neg_log_dens(state_p),
+            self.system.grad_neg_log_dens(state))
+        value = np.where(
+            accept, self.system.neg_log_dens(state_p),
+            self.system.neg_log_dens(state))
+        # Select per chain between proposed and current state components
+        for name in ('pos', 'mom', 'dir'):
+            setattr(state_p, name, np.where(
+                accept[:, None], getattr(state_p, name), getattr(state, name)))
+        state_p.dir *= -1
+        _cache_grad_neg_log_dens(self.system, state_p, (grad, value))
+        stats = {'hamiltonian': np.where(accept, h_final, h_init),
+                 'accept_prob': accept_prob, 'n_step': n_step,
+                 'non_reversible_step': False, 'convergence_error': False}
+        return state_p, stats
+
+
 def euclidean_no_u_turn_criterion(system, state_1, state_2, sum_mom):
     """No-U-turn termination criterion for Euclidean manifolds [1].
 
@@ -353,9 +523,9 @@ def euclidean_no_u_turn_criterion(system, state_1, state_2, sum_mom):
          adaptively setting path lengths in Hamiltonian Monte Carlo.
          Journal of Machine Learning Research, 15(1), pp.1593-1623.
     """
-    return (
-        np.sum(system.dh_dmom(state_1) * (state_2.pos - state_1.pos)) < 0 or
-        np.sum(system.dh_dmom(state_2) * (state_2.pos - state_1.pos)) < 0)
+    return _either_inner_product_negative(
+        system.dh_dmom(state_1), system.dh_dmom(state_2),
+        state_2.pos - state_1.pos)
 
 
 def riemannian_no_u_turn_criterion(system, state_1, state_2, sum_mom):
@@ -386,13 +556,12 @@ def riemannian_no_u_turn_criterion(system, state_1, state_2, sum_mom):
       2. Betancourt, M., 2013. Generalizing the no-U-turn sampler to Riemannian
          manifolds. arXiv preprint arXiv:1304.1920.
     """
-    return (
-        np.sum(system.dh_dmom(state_1) * sum_mom) < 0 or
-        np.sum(system.dh_dmom(state_2) * sum_mom) < 0)
+    return _either_inner_product_negative(
+        system.dh_dmom(state_1), system.dh_dmom(state_2), sum_mom)
 
 
 SubTree = namedtuple('SubTree', [
-    'negative', 'positive', 'sum_mom', 'weight', 'depth'])
+    'negative', 'positive', 'sum_mom', 'log_weight', 'depth'])
 
 
 class DynamicIntegrationTransition(IntegrationTransition):
@@ -461,131 +630,203 @@ class DynamicIntegrationTransition(IntegrationTransition):
         self.max_delta_h = max_delta_h
         self.termination_criterion = termination_criterion
         self.do_extra_subtree_checks = do_extra_subtree_checks
+        self._sum_mom_buffers = None
         self.statistic_types['tree_depth'] = (np.int64, -1)
-        self.statistic_types['diverging'] = (np.bool, False)
+        self.statistic_types['diverging'] = (np.bool_, False)
+        _use_numba_tree_functions()
 
-    def _termination_criterion(self, tree, neg_subtree, pos_subtree):
+    def _termination_criterion(self, tree, neg_subtree, pos_subtree,
+                               sum_mom_buffer):
         # If performing extra subtree checks evaluate lazily i.e. only evaluate
         # if initial whole tree check fails. Extra subtree checks also only
         # performed for trees of depth 2 and above (i.e. containing at least
-        # 4 states) as for trees of depth 1 they are redundant.
+        # 4 states) as for trees of depth 1 they are redundant. The momentum
+        # sums for the extra checks are written to a preallocated buffer.
         if self.termination_criterion(
                 self.system, tree.negative, tree.positive, tree.sum_mom):
             return True
         elif tree.depth > 1 and self.do_extra_subtree_checks:
             if self.termination_criterion(
                     self.system, neg_subtree.negative, pos_subtree.negative,
-                    neg_subtree.sum_mom + pos_subtree.negative.mom):
+                    np.add(neg_subtree.sum_mom, pos_subtree.negative.mom,
+                           out=sum_mom_buffer)):
                 return True
             elif self.termination_criterion(
                     self.system, neg_subtree.positive, pos_subtree.positive,
-                    pos_subtree.sum_mom + neg_subtree.positive.mom):
+                    np.add(pos_subtree.sum_mom, neg_subtree.positive.mom,
+                           out=sum_mom_buffer)):
                 return True
         return False
 
     def _new_leave(self, state, h, aux_info):
         return SubTree(
             negative=state, positive=state, sum_mom=np.asarray(state.mom),
-            weight=self._weight_function(h, aux_info), depth=0)
+            log_weight=self._log_weight_function(h, aux_info), depth=0)
 
-    def _merge_subtrees(self, neg_subtree, pos_subtree):
+    def _merge_subtrees(self, neg_subtree, pos_subtree, sum_mom_out):
         assert neg_subtree.depth == pos_subtree.depth, (
             'Cannot merg subtrees of different depths')
+        log_weight = _merge_log_weights_and_sum_moms(
+            neg_subtree.log_weight, pos_subtree.log_weight,
+            neg_subtree.sum_mom, pos_subtree.sum_mom, sum_mom_out)
         return SubTree(
             negative=neg_subtree.negative, positive=pos_subtree.positive,
-            weight=neg_subtree.weight + pos_subtree.weight,
-            sum_mom=neg_subtree.sum_mom + pos_subtree.sum_mom,
+            log_weight=log_weight, sum_mom=sum_mom_out,
             depth=neg_subtree.depth + 1)
 
+    def __getstate__(self):
+        # Don't pickle momentum sum buffers as reallocated when needed
+        return {**self.__dict__, '_sum_mom_buffers': None}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        _use_numba_tree_functions()
+
+    def _get_sum_mom_buffers(self, state):
+        # Rows 2 * d and 2 * d + 1 hold the momentum sums of the inner and
+        # outer subtrees of depth d built in _build_tree, rows 2 * D and
+        # 2 * D + 1 (where D is max_tree_depth) alternately hold the momentum
+        # sum of the whole tree and the final row is used as a temporary in
+        # the termination criterion checks on overlapping subtrees. No
+        # momentum sums are retained after a transition completes so the
+        # buffers are allocated once and reused across transitions.
+        shape = (2 * self.max_tree_depth + 3,) + np.shape(state.mom)
+        if self._sum_mom_buffers is None or (
+                self._sum_mom_buffers.shape != shape):
+            self._sum_mom_buffers = np.empty(shape)
+        return self._sum_mom_buffers
+
     def _init_aux_vars(self, state, rng):
         return {'h_init': self.system.h(state)}
 
     def _accept_stat(self, h, aux_vars):
-        return min(1, np.exp(aux_vars['h_init'] - h))
+        h_init = aux_vars['h_init']
+        return 1. if h <= h_init else exp(h_init - h)
 
     @abstractmethod
-    def _weight_function(self, h, aux_vars):
+    def _log_weight_function(self, h, aux_vars):
         pass
 
     @abstractmethod
-    def _weight_ratio(self, numerator, denominator):
+    def _weight_ratio(self, log_numerator, log_denominator):
         pass
 
     @abstractmethod
     def _check_divergence(self, h, aux_vars):
         pass
 
-    def _build_tree(self, depth, state, stats, rng, aux_vars):
-        if depth == 0:
-            # recursion base case
+    def _build_tree(self, depth, state, stats, rng, aux_vars, sum_mom_buffers,
+                    sum_mom_out):
+        # The tree is built iteratively by integrating 2**depth steps from
+        # state and merging each pair of adjacent subtrees of equal depth as
+        # soon as both are complete. This visits subtrees in the same order as
+        # a depth-first recursive construction, with the pending subtrees (at
+        # most one per depth) stored on an explicit stack rather than in
+        # nested calls. The momentum sum of a merged subtree of depth d < depth
+        # is written to row 2 * d of sum_mom_buffers if it is the inner
+        # subtree of its parent or row 2 * d + 1 if the outer subtree.
+        # The uniform variates for the progressive sampling on each of the
+        # 2**depth - 1 subtree merges are drawn in a single vectorised call.
+        u_merge = rng.random(2**depth - 1)
+        n_merge = 0
+        stack = []
+        # bind attributes accessed for every leaf / merge to local variables
+        # to avoid repeated attribute lookups in loop
+        integrator_step = self.integrator.step
+        system_h = self.system.h
+        new_leave = self._new_leave
+        accept_stat = self._accept_stat
+        check_divergence = self._check_divergence
+        merge_subtrees = self._merge_subtrees
+        weight_ratio = self._weight_ratio
+        termination_criterion = self._termination_criterion
+        forward = state.dir == 1
+        for leaf_index in range(2**depth):
             try:
                 # integrate forward/backward one step depending on state.dir
-                state = self.integrator.step(state)
-                h = self.system.h(state)
-                h = np.inf if np.isnan(h) else h
+                state = integrator_step(state)
+                h = system_h(state)
+                h = inf if isnan(h) else h
                 # create new tree leave
-                tree = self._new_leave(state, h, aux_vars)
+                tree = new_leave(state, h, aux_vars)
                 proposal = state
                 # accumulate stats to calculate proxy acceptance probability
-                stats['sum_acc_prob'] += self._accept_stat(h, aux_vars)
+                stats['sum_acc_prob'] += accept_stat(h, aux_vars)
                 stats['n_step'] += 1
-                # default to assuming valid and then check for divergence
-                terminate = False
-                self._check_divergence(h, aux_vars)
+                # check for divergence
+                check_divergence(h, aux_vars)
             except Error as e:
                 _process_integrator_error(e, stats)
-                terminate, tree, proposal = True, None, None
-            return terminate, tree, proposal
-        # build 'inner' subtree, i.e. starting from current state
-        terminate, inner_tree, inner_proposal = self._build_tree(
-            depth - 1, state, stats, rng, aux_vars)
-        if terminate:
-            return terminate, None, None
-        # build 'outer' subtree, i.e. starting from terminus of inner subtree
-        state = inner_tree.positive if state.dir == 1 else inner_tree.negative
-        terminate, outer_tree, outer_proposal = self._build_tree(
-            depth - 1, state, stats, rng, aux_vars)
-        if terminate:
-            return terminate, None, None
-        # merge two subtrees accounting for integration direction
-        neg_subtree = inner_tree if state.dir == 1 else outer_tree
-        pos_subtree = outer_tree if state.dir == 1 else inner_tree
-        tree = self._merge_subtrees(neg_subtree, pos_subtree)
-        # sample new proposal from two subtree proposals according to weights
-        accept_outer_prob = self._weight_ratio(outer_tree.weight, tree.weight)
-        proposal = (
-            outer_proposal if rng.uniform() < accept_outer_prob else
-            inner_proposal)
-        # check termination criterion on tree and subtrees
-        terminate = self._termination_criterion(tree, neg_subtree, pos_subtree)
-        return terminate, tree, proposal
+                return True, None, None
+            # merge completed 'inner' and 'outer' subtrees of equal depth
+            while stack and stack[-1][0].depth == tree.depth:
+                inner_tree, inner_proposal = stack.pop()
+                outer_tree, outer_proposal = tree, proposal
+                # merge two subtrees accounting for integration direction
+                neg_subtree = inner_tree if forward else outer_tree
+                pos_subtree = outer_tree if forward else inner_tree
+                merged_depth = tree.depth + 1
+                tree = merge_subtrees(
+                    neg_subtree, pos_subtree,
+                    sum_mom_out if merged_depth == depth else
+                    sum_mom_buffers[
+                        2 * merged_depth + ((leaf_index >> merged_depth) & 1)])
+                # sample new proposal from two subtree proposals according to
+                # weights
+                accept_outer_prob = weight_ratio(
+                    outer_tree.log_weight, tree.log_weight)
+                proposal = (
+                    outer_proposal if u_merge[n_merge] < accept_outer_prob
+                    else inner_proposal)
+                n_merge += 1
+                # check termination criterion on tree and subtrees
+                if termination_criterion(
+                        tree, neg_subtree, pos_subtree, sum_mom_buffers[-1]):
+                    return True, None, None
+            stack.append((tree, proposal))
+        return False, tree, proposal
 
     def sample(self, state, rng):
         stats = {'n_step': 0, 'sum_acc_prob': 0.}
         aux_vars = self._init_aux_vars(state, rng)
         tree = self._new_leave(state, aux_vars['h_init'], aux_vars)
+        sum_mom_buffers = self._get_sum_mom_buffers(state)
         next_state = state
-        for depth in range(self.max_tree_depth):
+        # draw uniform variates for direction and progressive sampling of all
+        # tree expansions up front to avoid per-draw generator call overhead
+        max_tree_depth = self.max_tree_depth
+        u_dir, u_acc = rng.random((2, max_tree_depth))
+        # bind attributes accessed in each tree expansion to local variables
+        build_tree = self._build_tree
+        weight_ratio = self._weight_ratio
+        merge_subtrees = self._merge_subtrees
+        termination_criterion = self._termination_criterion
+        for depth in range(max_tree_depth):
             # uniformly sample direction to expand tree in
-            direction = 2 * (rng.uniform() < 0.5) - 1
+            direction = 2 * (u_dir[depth] < 0.5) - 1
             state = tree.positive if direction == 1 else tree.negative
             state.dir = direction
             # expand tree by building new subtree of current depth
-            terminate, new_tree, new_proposal = self._build_tree(
-                depth, state, stats, rng, aux_vars)
+            terminate, new_tree, new_proposal = build_tree(
+                depth, state, stats, rng, aux_vars, sum_mom_buffers,
+                sum_mom_buffers[2 * depth])
             if terminate:
                 break
             # progressively sample new state by choosing between
             # current new state and proposal from new subtree, biasing
             # towards the new subtree proposal
-            if rng.uniform() < self._weight_ratio(new_tree.weight, tree.weight):
+            if u_acc[depth] < weight_ratio(
+                    new_tree.log_weight, tree.log_weight):
                 next_state = new_proposal
             # merge new subtree into current tree accounting for direction
             neg_subtree = tree if direction == 1 else new_tree
             pos_subtree = new_tree if direction == 1 else tree
-            tree = self._merge_subtrees(neg_subtree, pos_subtree)
+            tree = merge_subtrees(
+                neg_subtree, pos_subtree,
+                sum_mom_buffers[2 * max_tree_depth + depth % 2])
             # check termination criterion on new tree and subtrees
-            if self._termination_criterion(tree, neg_subtree, pos_subtree):
+            if termination_criterion(
+                    tree, neg_subtree, pos_subtree, sum_mom_buffers[-1]):
                 break
         sum_acc_prob = stats.pop('sum_acc_prob')
         if stats['n_step'] > 0:
@@ -617,11 +858,14 @@ class MultinomialDynamicIntegrationTransition(DynamicIntegrationTransition):
          Carlo. arXiv preprint arXiv:1701.02434.
     """
 
-    def _weight_function(self, h, aux_vars):
-        return LogRepFloat(log_val=-h)
+    def _log_weight_function(self, h, aux_vars):
+        return -h
 
-    def _weight_ratio(self, numerator, denominator):
-        return min(numerator / denominator, 1)
+    def _weight_ratio(self, log_numerator, log_denominator):
+        if log_numerator >= log_denominator:
+            return 1.
+        else:
+            return exp(log_numerator - log_denominator)
 
     def _check_divergence(self, h, aux_vars):
         if h - aux_vars['h_init'] > self.max_delta_h:
@@ -653,16 +897,21 @@ class SliceDynamicIntegrationTransition(DynamicIntegrationTransition):
 
     def _init_aux_vars(self, state, rng):
         aux_vars = super()._init_aux_vars(state, rng)
-        aux_vars['log_u'] = np.log(rng.uniform()) - aux_vars['h_init']
+        # 1 - u is uniform on (0, 1] so its logarithm is always finite
+        aux_vars['log_u'] = log1p(-rng.random()) - aux_vars['h_init']
         return aux_vars
 
-    def _weight_function(self, h, aux_vars):
-        return (aux_vars['log_u'] <= -h) * 1
+    def _log_weight_function(self, h, aux_vars):
+        # Logarithm of indicator of whether state is in slice
+        return 0. if aux_vars['log_u'] <= -h else -inf
 
-    def _weight_ratio(self, numerator, denominator):
-        return (
-            min(numerator / denominator, 1) if denominator > 0 else
-            min(numerator, 1))
+    def _weight_ratio(self, log_numerator, log_denominator):
+        if log_denominator == -inf:
+            return 1. if log_numerator > -inf else 0.
+        elif log_numerator >= log_denominator:
+            return 1.
+        else:
+            return exp(log_numerator - log_denominator)
 
     def _check_divergence(self, h, aux_vars):
         if h + aux_vars['log_u'] > self.max_delta_h:
@@ -1,3 +1,4 @@
+import pickle
 import numpy as np
 import mici.integrators as integrators
 import mici.systems as systems
@@ -7,6 +8,12 @@ from mici.states import ChainState
 from mici.errors import IntegratorError
 from functools import wraps
 
+if integrators.NUMBA_AVAILABLE:
+    import numba
+
+if integrators.JAX_AVAILABLE:
+    import jax.numpy as jnp
+
 SEED = 3046987125
 SIZES = {1, 2, 5}
 N_STEPS = {1, 5, 20}
@@ -76,6 +83,35 @@ def _generate_metrics(rng, size, eigval_scale=0.1):
     ]
 
 
+def _check_states_close(state_1, state_2, rtol, atol):
+    assert state_1.pos.dtype == state_2.pos.dtype, (
+        f'position dtypes differ ({state_1.pos.dtype}, {state_2.pos.dtype}).')
+    assert state_1.mom.dtype == state_2.mom.dtype, (
+        f'momentum dtypes differ ({state_1.mom.dtype}, {state_2.mom.dtype}).')
+    assert np.allclose(state_1.pos, state_2.pos, rtol=rtol, atol=atol), (
+        f'positions differ.\n'
+        f'first position  = {state_1.pos},\n'
+        f'second position = {state_2.pos}.')
+    assert np.allclose(state_1.mom, state_2.mom, rtol=rtol, atol=atol), (
+        f'momentums differ.\n'
+        f'first momentum  = {state_1.mom},\n'
+        f'second momentum = {state_2.mom}.')
+
+
+def _tolerances(dtype):
+    return (1e-4, 1e-5) if dtype == np.float32 else (1e-8, 1e-10)
+
+
+class InPlaceFlowEuclideanMetricSystem(systems.EuclideanMetricSystem):
+    """Euclidean metric system with flow maps updating state in place."""
+
+    def h1_flow(self, state, dt):
+        state.mom -= dt * self.dh1_dpos(state)
+
+    def h2_flow(self, state, dt):
+        state.pos += dt * self.dh2_dmom(state)
+
+
 class IntegratorTestCase(object):
 
     def __init__(self, integrators_and_state_lists, h_diff_tol=5e-3):
@@ -245,6 +281,48 @@ class TestLeapfrogIntegratorGaussianLinearSystem(
         super().__init__(integrators_and_state_lists, h_diff_tol=1e-10)
 
 
+class TestLeapfrogIntegratorGaussianLinearSystemSinglePrecision(
+        IntegratorTestCase):
+
+    def __init__(self):
+        rng = np.random.RandomState(SEED)
+        integrators_and_state_lists = []
+        for size in SIZES:
+            for metric in _generate_metrics(rng, size):
+                system = systems.GaussianEuclideanMetricSystem(
+                    neg_log_dens=lambda q: 0,
+                    metric=metric,
+                    grad_neg_log_dens=lambda q: 0 * q)
+                integrator = integrators.LeapfrogIntegrator(system, 0.5)
+                state_list = [
+                    ChainState(pos=q.astype(np.float32),
+                               mom=p.astype(np.float32), dir=1)
+                    for q, p in rng.standard_normal((N_STATE, 2, size))]
+                integrators_and_state_lists.append((integrator, state_list))
+        super().__init__(integrators_and_state_lists, h_diff_tol=1e-4)
+
+    @iterate_over_integrators_states_n_steps
+    def test_reversibility(integrator, init_state, n_step):
+        state = _integrate_with_reversal(integrator, init_state, n_step)
+        state = _integrate_with_reversal(integrator, state, n_step)
+        _check_states_close(
+            state, init_state, *_tolerances(init_state.pos.dtype))
+        assert state.dir == init_state.dir, (
+            'integrator not returning on reversal to initial direction.')
+
+    @iterate_over_integrators_states_n_steps
+    def test_state_dtype(integrator, init_state, n_step):
+        state = init_state
+        for s in range(n_step):
+            state = integrator.step(state)
+        assert state.pos.dtype == init_state.pos.dtype, (
+            f'integrator changed position dtype from {init_state.pos.dtype} '
+            f'to {state.pos.dtype}.')
+        assert state.mom.dtype == init_state.mom.dtype, (
+            f'integrator changed momentum dtype from {init_state.mom.dtype} '
+            f'to {state.mom.dtype}.')
+
+
 class TestLeapfrogIntegratorGaussianNonLinearSystem(IntegratorTestCase):
 
     def __init__(self):
@@ -404,3 +482,290 @@ class TestConstrainedLeapfrogIntegratorGaussianNonLinearSystem(
                     integrators_and_state_lists.append(
                         (integrator, state_list))
         super().__init__(integrators_and_state_lists, h_diff_tol=1e-2)
+
+
+class TestLeapfrogIntegratorInPlaceFlowSystem(IntegratorTestCase):
+
+    def __init__(self):
+        rng = np.random.RandomState(SEED)
+        integrators_and_state_lists = []
+        for size in SIZES:
+            for metric in _generate_metrics(rng, size):
+                system = InPlaceFlowEuclideanMetricSystem(
+                    neg_log_dens=lambda q: 0.25 * np.sum(q**4),
+                    metric=metric,
+                    grad_neg_log_dens=lambda q: q**3)
+                integrator = integrators.LeapfrogIntegrator(system, 0.05)
+                state_list = [
+                    ChainState(pos=q, mom=p, dir=1)
+                    for q, p in rng.standard_normal((N_STATE, 2, size))]
+                integrators_and_state_lists.append((integrator, state_list))
+        super().__init__(integrators_and_state_lists, h_diff_tol=1e-2)
+
+
+class JitMultiStepTestCase(object):
+
+    def __init__(self, integrators_and_state_lists):
+        self.integrators_and_state_lists = integrators_and_state_lists
+
+    @iterate_over_integrators_states_n_steps
+    def test_jit_multi_step_matches_step(integrator, init_state, n_step):
+        assert integrator.can_jit_multi_step, (
+            'integrator not able to use jit_multi_step with system')
+        init_pos = init_state.pos.copy()
+        init_mom = init_state.mom.copy()
+        jit_state, valid = integrator.jit_multi_step(init_state, n_step)
+        assert np.all(valid), 'jit_multi_step reporting non-finite gradient'
+        assert np.all(init_state.pos == init_pos), (
+            'jit_multi_step modifiying passed state.pos attribute')
+        assert np.all(init_state.mom == init_mom), (
+            'jit_multi_step modifiying passed state.mom attribute')
+        state = init_state
+        for s in range(n_step):
+            state = integrator.step(state)
+        _check_states_close(
+            jit_state, state, *_tolerances(init_state.pos.dtype))
+
+    @iterate_over_integrators_states_n_steps
+    def test_jit_multi_step_state_writeable(integrator, init_state, n_step):
+        jit_state, valid = integrator.jit_multi_step(init_state, n_step)
+        mom = jit_state.mom.copy()
+        jit_state.pos += 1
+        jit_state.mom *= -1
+        assert np.all(jit_state.mom == -mom), (
+            'jit_multi_step returned state momentum not updated in place')
+
+    @iterate_over_integrators_states_n_steps
+    def test_jit_multi_step_caches_gradient(integrator, init_state, n_step):
+        call_counts = {}
+        init_state = ChainState(
+            pos=init_state.pos, mom=init_state.mom, dir=init_state.dir,
+            _call_counts=call_counts)
+        system = integrator.system
+        jit_state, valid = integrator.jit_multi_step(init_state, n_step)
+        grad = system.dh1_dpos(jit_state)
+        grad_key = type(system).__name__ + '.grad_neg_log_dens'
+        assert call_counts[grad_key] == 1, (
+            'jit_multi_step not caching gradient in returned state')
+        state = ChainState(pos=jit_state.pos, mom=jit_state.mom, dir=1)
+        rtol, atol = _tolerances(init_state.pos.dtype)
+        assert np.allclose(grad, system.dh1_dpos(state), rtol, atol), (
+            'jit_multi_step cached gradient differs from recomputed value')
+        assert np.allclose(
+            system.h1(jit_state), system.h1(state), rtol, atol), (
+            'jit_multi_step cached value differs from recomputed value')
+
+
+class BatchedSystemTestCase(object):
+
+    def __init__(self, batched_and_unbatched_integrators_and_state_lists):
+        self.batched_and_unbatched_integrators_and_state_lists = (
+            batched_and_unbatched_integrators_and_state_lists)
+
+    @staticmethod
+    def check_batched_matches_unbatched(
+            batched_integrator, unbatched_integrator, batched_state, n_step,
+            jit):
+        rtol, atol = _tolerances(batched_state.pos.dtype)
+        chain_h = [
+            unbatched_integrator.system.h(
+                ChainState(pos=pos, mom=mom, dir=1))
+            for pos, mom in zip(batched_state.pos, batched_state.mom)]
+        assert np.allclose(
+            batched_integrator.system.h(batched_state), chain_h, rtol=rtol,
+            atol=atol), 'batched and per-chain Hamiltonians differ'
+        if jit:
+            batched_final_state, valid = batched_integrator.jit_multi_step(
+                batched_state, n_step)
+            assert np.all(valid), (
+                'jit_multi_step reporting non-finite gradient')
+        else:
+            batched_final_state = batched_state
+            for s in range(n_step):
+                batched_final_state = batched_integrator.step(
+                    batched_final_state)
+        for c, (pos, mom, dir) in enumerate(zip(
+                batched_state.pos, batched_state.mom, batched_state.dir)):
+            state = ChainState(pos=pos, mom=mom, dir=int(dir[0]))
+            for s in range(n_step):
+                state = unbatched_integrator.step(state)
+            _check_states_close(
+                ChainState(pos=batched_final_state.pos[c],
+                           mom=batched_final_state.mom[c], dir=1),
+                state, rtol, atol)
+
+    def test_batched_matches_unbatched(self):
+        for (batched_integrator, unbatched_integrator, state_list) in (
+                self.batched_and_unbatched_integrators_and_state_lists):
+            for state in state_list:
+                for n_step in N_STEPS:
+                    for jit in {False, batched_integrator.can_jit_multi_step}:
+                        yield (self.check_batched_matches_unbatched,
+                               batched_integrator, unbatched_integrator,
+                               state, n_step, jit)
+
+
+def _generate_batched_state_list(rng, size, n_chain, dtype):
+    return [
+        ChainState(pos=q.astype(dtype), mom=p.astype(dtype),
+                   dir=rng.choice([-1., 1.], size=(n_chain, 1)))
+        for q, p in rng.standard_normal((N_STATE, 2, n_chain, size))]
+
+
+class TestBatchedEuclideanMetricSystem(BatchedSystemTestCase):
+
+    def __init__(self):
+        rng = np.random.RandomState(SEED)
+        batched_and_unbatched_integrators_and_state_lists = []
+        for size in SIZES:
+            for metric in _generate_metrics(rng, size):
+                batched_system = systems.BatchedEuclideanMetricSystem(
+                    neg_log_dens=lambda q: 0.25 * np.sum(q**4, -1),
+                    metric=metric,
+                    grad_neg_log_dens=lambda q: q**3)
+                unbatched_system = systems.EuclideanMetricSystem(
+                    neg_log_dens=lambda q: 0.25 * np.sum(q**4),
+                    metric=metric,
+                    grad_neg_log_dens=lambda q: q**3)
+                for dtype in [np.float64, np.float32]:
+                    batched_and_unbatched_integrators_and_state_lists.append((
+                        integrators.LeapfrogIntegrator(batched_system, 0.05),
+                        integrators.LeapfrogIntegrator(unbatched_system, 0.05),
+                        _generate_batched_state_list(rng, size, 3, dtype)))
+        super().__init__(batched_and_unbatched_integrators_and_state_lists)
+
+
+if integrators.NUMBA_AVAILABLE:
+
+    @numba.njit
+    def _numba_neg_log_dens(q):
+        return 0.25 * np.sum(q**4)
+
+    @numba.njit
+    def _numba_grad_neg_log_dens(q):
+        return q**3
+
+    @numba.njit
+    def _numba_grad_and_value_neg_log_dens(q):
+        return q**3, 0.25 * np.sum(q**4)
+
+    @numba.njit
+    def _numba_batched_neg_log_dens(q):
+        return 0.25 * np.sum(q**4, axis=-1)
+
+    @numba.njit
+    def _numba_batched_grad_and_value_neg_log_dens(q):
+        return q**3, 0.25 * np.sum(q**4, axis=-1)
+
+    class TestLeapfrogIntegratorNumbaJitMultiStep(JitMultiStepTestCase):
+
+        def __init__(self):
+            rng = np.random.RandomState(SEED)
+            integrators_and_state_lists = []
+            for size in SIZES:
+                for metric in _generate_metrics(rng, size):
+                    for grad_neg_log_dens in [
+                            _numba_grad_neg_log_dens,
+                            _numba_grad_and_value_neg_log_dens]:
+                        system = systems.EuclideanMetricSystem(
+                            neg_log_dens=_numba_neg_log_dens,
+                            metric=metric,
+                            grad_neg_log_dens=grad_neg_log_dens)
+                        integrator = integrators.LeapfrogIntegrator(
+                            system, 0.05)
+                        for dtype in [np.float64, np.float32]:
+                            state_list = [
+                                ChainState(pos=q.astype(dtype),
+                                           mom=p.astype(dtype), dir=1)
+                                for q, p in rng.standard_normal(
+                                    (N_STATE, 2, size))]
+                            integrators_and_state_lists.append(
+                                (integrator, state_list))
+            super().__init__(integrators_and_state_lists)
+
+    class TestNumbaBatchedEuclideanMetricSystem(BatchedSystemTestCase):
+
+        def __init__(self):
+            rng = np.random.RandomState(SEED)
+            batched_and_unbatched_integrators_and_state_lists = []
+            for size in SIZES:
+                for metric in _generate_metrics(rng, size):
+                    batched_system = systems.BatchedEuclideanMetricSystem(
+                        neg_log_dens=_numba_batched_neg_log_dens,
+                        metric=metric,
+                        grad_neg_log_dens=(
+                            _numba_batched_grad_and_value_neg_log_dens))
+                    unbatched_system = systems.EuclideanMetricSystem(
+                        neg_log_dens=_numba_neg_log_dens,
+                        metric=metric,
+                        grad_neg_log_dens=_numba_grad_neg_log_dens)
+                    for dtype, thread_parallel in [
+                            (np.float64, False), (np.float32, False),
+                            (np.float64, True)]:
+                        (batched_and_unbatched_integrators_and_state_lists
+                         .append((
+                            integrators.LeapfrogIntegrator(
+                                batched_system, 0.05,
+                                thread_parallel=thread_parallel),
+                            integrators.LeapfrogIntegrator(
+                                unbatched_system, 0.05),
+                            _generate_batched_state_list(
+                                rng, size, 3, dtype))))
+            super().__init__(batched_and_unbatched_integrators_and_state_lists)
+
+
+if integrators.JAX_AVAILABLE:
+
+    def _jax_neg_log_dens(q):
+        return 0.25 * jnp.sum(q**4)
+
+    class TestLeapfrogIntegratorJaxJitMultiStep(JitMultiStepTestCase):
+
+        def __init__(self):
+            rng = np.random.RandomState(SEED)
+            integrators_and_state_lists = []
+            for size in SIZES:
+                for metric in _generate_metrics(rng, size):
+                    system = systems.JaxEuclideanMetricSystem(
+                        _jax_neg_log_dens, metric=metric)
+                    integrator = integrators.LeapfrogIntegrator(system, 0.05)
+                    # JAX uses single precision by default
+                    state_list = [
+                        ChainState(pos=q.astype(np.float32),
+                                   mom=p.astype(np.float32), dir=1)
+                        for q, p in rng.standard_normal((N_STATE, 2, size))]
+                    integrators_and_state_lists.append(
+                        (integrator, state_list))
+            super().__init__(integrators_and_state_lists)
+
+        @iterate_over_integrators_states_n_steps
+        def test_pickled_integrator_matches(integrator, init_state, n_step):
+            pickled_integrator = pickle.loads(pickle.dumps(integrator))
+            jit_state, valid = integrator.jit_multi_step(init_state, n_step)
+            pickled_jit_state, pickled_valid = (
+                pickled_integrator.jit_multi_step(init_state, n_step))
+            assert valid == pickled_valid, (
+                'pickled integrator validity flag differs')
+            _check_states_close(
+                jit_state, pickled_jit_state,
+                *_tolerances(init_state.pos.dtype))
+
+    class TestBatchedJaxEuclideanMetricSystem(BatchedSystemTestCase):
+
+        def __init__(self):
+            rng = np.random.RandomState(SEED)
+            batched_and_unbatched_integrators_and_state_lists = []
+            for size in SIZES:
+                for metric in _generate_metrics(rng, size):
+                    batched_system = systems.BatchedJaxEuclideanMetricSystem(
+                        _jax_neg_log_dens, metric=metric)
+                    unbatched_system = systems.JaxEuclideanMetricSystem(
+                        _jax_neg_log_dens, metric=metric)
+                    (batched_and_unbatched_integrators_and_state_lists
+                     .append((
+                        integrators.LeapfrogIntegrator(batched_system, 0.05),
+                        integrators.LeapfrogIntegrator(
+                            unbatched_system, 0.05),
+                        _generate_batched_state_list(
+                            rng, size, 3, np.float32))))
+            super().__init__(batched_and_unbatched_integrators_and_state_lists)